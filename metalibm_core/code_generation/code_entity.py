@@ -43,71 +43,182 @@ from .generator_utility import FunctionOperator, FO_Arg
 from .code_constant import *
 from ..core.attributes import Attributes, AttributeCtor
 
+# standard IEEE packages imported by every generated VHDL entity
+_VHDL_STD_HEADERS = (
+  "ieee.std_logic_1164.all",
+  "ieee.std_logic_unsigned.all",
+  "ieee.numeric_std.all",
+)
+
 
 class CodeEntity(object):
   """ function code object """
+  __slots__ = (
+    "name", "arg_list", "arg_map", "output_map",
+    "_output_ports", "_output_index",
+    "_input_decl_strs", "_output_decl_strs_entity", "_output_decl_strs_component",
+    "_output_assign_cache",
+    "language", "code_object", "entity_object", "entity_operator",
+    "process_list", "current_stage",
+    "component_object", "_component_version",
+    "_decl_cache", "_decl_version",
+    "_scheme_cache", "_scheme_version",
+    "init_stage_attribute", "init_op_attribute",
+  )
+  # dynamic attribute constructors shared by every entity and registered
+  # once per process (see instanciate_dyn_attributes)
+  _init_stage_attribute = None
+  _init_op_attribute = None
+
   def __init__(self, name, arg_list = None, output_map = None, code_object = None, language = VHDL_Code):
     """ code function initialization """
     self.name = name
-    self.arg_list = arg_list if arg_list else []
-    self.arg_map = dict((arg.get_tag(), arg) for arg in self.arg_list)
+    self.arg_list = list(arg_list) if arg_list else []
+    self.arg_map = {arg.get_tag(): arg for arg in self.arg_list}
     self.output_map = output_map if output_map else {}
+    # pre-materialized output port list and name->position index; output
+    # values and precisions are always read through the ReferenceAssign
+    # nodes, which optimization passes (e.g. retiming) may rewire in
+    # place without notifying the entity
+    self._output_ports = []
+    self._output_index = {}
+    # per-port declaration strings computed once at add time (in the
+    # entity's own language); a None entry forces the slow path
+    self._input_decl_strs = []
+    self._output_decl_strs_entity = []
+    self._output_decl_strs_component = []
+    # dedup cache of ReferenceAssign built per (name, output node) pair
+    self._output_assign_cache = {}
+    self.language = language
+    for arg in self.arg_list:
+      self._input_decl_strs.append(self._port_decl_str(arg.get_tag(), "in", arg.get_precision()))
+    for output_name, output_assign in self.output_map.items():
+      self._register_output_assign(output_name, output_assign)
     self.code_object = code_object
     self.entity_object   = None
     self.entity_operator = None
-    self.language = language
     self.process_list = []
     self.current_stage = 0
     # component object to generate external instance of entity
     self.component_object = None
+    # interface version the component object was built against
+    self._component_version = -1
+    # cache of generated declaration strings, invalidated whenever the
+    # entity's interface is modified (see _invalidate_decl_cache)
+    self._decl_cache = {}
+    self._decl_version = 0
+    # memoized implementation Statement (see get_scheme)
+    self._scheme_cache = None
+    self._scheme_version = -1
     self.instanciate_dyn_attributes()
 
+  def _invalidate_decl_cache(self):
+    """ record an interface mutation: discard cached declaration strings """
+    self._decl_version += 1
+    self._decl_cache = {}
+
+  def _resolve_output_precision(self, output_assign):
+    """ derive the format of @p output_assign from its current port and
+        value nodes (read-through: assigns may be rewired in place) """
+    out_signal = output_assign.get_input(0)
+    if out_signal.get_precision() is None:
+      return output_assign.get_input(1).get_precision()
+    return out_signal.get_precision()
+
+  def _port_decl_str(self, name, direction, precision):
+    """ build the "<name> : <direction> <format>" port descriptor string,
+        or None if the port format cannot be resolved yet """
+    if precision is None:
+      return None
+    return f"{name} : {direction} {precision.get_code_name(language=self.language)}"
+
+  def _register_output_assign(self, name, output_assign):
+    """ record the port of @p output_assign and its pre-computed
+        declaration strings """
+    output_port = output_assign.get_input(0)
+    output_value = output_assign.get_input(1)
+    self._output_index[name] = len(self._output_ports)
+    self._output_ports.append(output_port)
+    port_tag = output_port.get_tag()
+    self._output_decl_strs_entity.append(self._port_decl_str(port_tag, "out", self._resolve_output_precision(output_assign)))
+    self._output_decl_strs_component.append(self._port_decl_str(port_tag, "out", output_port.get_precision()))
+    self._output_assign_cache[(name, id(output_value))] = output_assign
+
+  def _get_cached_output_assign(self, name, output_node):
+    """ return the existing ReferenceAssign if @p output_node is already
+        wired to output @p name, None otherwise """
+    cached = self._output_assign_cache.get((name, id(output_node)))
+    if cached is not None and self.output_map.get(name) is cached and cached.get_input(1) is output_node:
+      return cached
+    return None
+
   def instanciate_dyn_attributes(self):
-    # attribute to contain thestage where the pipelined
-    # signal was originally created
-    self.init_stage_attribute = AttributeCtor("init_stage", default_value = self.current_stage)
-    # attribute to contain the original operation for the pipelined signals
-    self.init_op_attribute    = AttributeCtor("init_op", default_value = None) 
-    Attributes.add_dyn_attribute(self.init_stage_attribute)
-    Attributes.add_dyn_attribute(self.init_op_attribute)
+    if CodeEntity._init_stage_attribute is None:
+      # attribute to contain thestage where the pipelined
+      # signal was originally created
+      CodeEntity._init_stage_attribute = AttributeCtor("init_stage", default_value = self.current_stage)
+      # attribute to contain the original operation for the pipelined signals
+      CodeEntity._init_op_attribute    = AttributeCtor("init_op", default_value = None)
+      Attributes.add_dyn_attribute(CodeEntity._init_stage_attribute)
+      Attributes.add_dyn_attribute(CodeEntity._init_op_attribute)
+    self.init_stage_attribute = CodeEntity._init_stage_attribute
+    self.init_op_attribute    = CodeEntity._init_op_attribute
+    # reset the default stage to this entity's starting stage
+    self.init_stage_attribute.default_value = self.current_stage
 
   def get_name(self):
     return self.name
 
   def add_input_variable(self, name, vartype):
-    input_var = Variable(name, precision = vartype) 
+    input_var = Variable(name, precision = vartype)
     self.arg_list.append(input_var)
     self.arg_map[name] = input_var
+    self._input_decl_strs.append(self._port_decl_str(name, "in", vartype))
+    self._invalidate_decl_cache()
     return input_var
   def add_output_variable(self, name, output_node):
+    cached_assign = self._get_cached_output_assign(name, output_node)
+    if cached_assign is not None:
+      return cached_assign
     output_var = Variable(name, precision = output_node.get_precision(), var_type = Variable.Output)
     output_assign = ReferenceAssign(output_var, output_node)
     if name in self.output_map:
         Log.report(Log.error, "pre-existing name {} in output_map".format(name))
     self.output_map[name] = output_assign
+    self._register_output_assign(name, output_assign)
+    self._invalidate_decl_cache()
 
   def add_input_signal(self, name, signaltype):
-    input_signal = Signal(name, precision = signaltype) 
+    input_signal = Signal(name, precision = signaltype)
     self.arg_list.append(input_signal)
     self.arg_map[name] = input_signal
+    self._input_decl_strs.append(self._port_decl_str(name, "in", signaltype))
+    self._invalidate_decl_cache()
     return input_signal
   def add_output_signal(self, name, output_node):
+    cached_assign = self._get_cached_output_assign(name, output_node)
+    if cached_assign is not None:
+      return cached_assign
     output_var = Signal(name, precision = output_node.get_precision(), var_type = Signal.Output)
     output_assign = ReferenceAssign(output_var, output_node)
     if name in self.output_map:
         Log.report(Log.Error, "pre-existing name {} in output_map".format(name))
     self.output_map[name] = output_assign
+    self._register_output_assign(name, output_assign)
+    self._invalidate_decl_cache()
   def set_output_signal(self, name, output_node):
     """ Update the node associated with the output with name @p name """
     if not name in self.output_map:
         Log.report(Log.Error, "[set_output_signal] name {} not in output_map", name)
     self.output_map[name].set_input(1, output_node)
+    # refresh the pre-computed declaration string for this output
+    index = self._output_index[name]
+    output_port = self._output_ports[index]
+    self._output_decl_strs_entity[index] = self._port_decl_str(output_port.get_tag(), "out", self._resolve_output_precision(self.output_map[name]))
+    self._invalidate_decl_cache()
 
   def get_input_by_tag(self, tag):
-    if tag in self.arg_map:
-      return self.arg_map[tag]
-    else:
-      return None
+    return self.arg_map.get(tag)
 
   def get_port_from_output(self, out):
     return out.get_input(0)
@@ -121,9 +232,9 @@ class CodeEntity(object):
   def get_output_port_by_name(self, name):
     return self.get_port_from_output(self.output_map[name])
   def get_output_list(self):
-    return [self.get_value_from_output(op) for op in self.get_output_assign()]
+    return [self.get_value_from_output(op) for op in self.output_map.values()]
   def get_output_port(self):
-    return [self.get_port_from_output(op) for op in self.get_output_assign()]
+    return list(self._output_ports)
 
   def get_current_stage(self):
     return self.current_stage
@@ -136,25 +247,33 @@ class CodeEntity(object):
 
   def add_process(self, new_process):
     self.process_list.append(new_process)
+    # processes feed the scheme Statement: invalidate the shared version
+    self._invalidate_decl_cache()
   def register_new_input_variable(self, new_input):
     self.arg_list.append(new_input)
+    self.arg_map[new_input.get_tag()] = new_input
+    self._input_decl_strs.append(self._port_decl_str(new_input.get_tag(), "in", new_input.get_precision()))
+    self._invalidate_decl_cache()
 
   def get_arg_list(self):
     return self.arg_list
   def clear_arg_list(self):
     self.arg_list = []
+    self._input_decl_strs = []
+    self._invalidate_decl_cache()
 
   def get_component_object(self):
-    if self.component_object is None:
+    if self.component_object is None or self._component_version != self._decl_version:
       self.component_object = self.build_component_object()
+      self._component_version = self._decl_version
     return self.component_object
 
   def build_component_object(self):
     io_map = {}
     for arg_input in self.arg_list:
-      io_map[arg_input] = AbstractVariable.Input 
-    for arg_output in self.get_output_port():
-      io_map[arg_output] = AbstractVariable.Output 
+      io_map[arg_input] = AbstractVariable.Input
+    for arg_output in self._output_ports:
+      io_map[arg_output] = AbstractVariable.Output
     return ComponentObject(self.name, io_map, self)
 
   def get_output_precision(self, output):
@@ -168,51 +287,81 @@ class CodeEntity(object):
             ML_Format: output format
     """
     assert isinstance(output, ReferenceAssign)
-    out_signal = output.get_input(0)
-    out_value  = output.get_input(1)
-    if out_signal.get_precision() is None:
-        return out_value.get_precision()
-    else:
-        return out_signal.get_precision()
+    return self._resolve_output_precision(output)
 
   def get_declaration(self, final = True, language = None):
     language = self.language if language is None else language
-    def get_in_prec_code_name(node, language=None):
-        prec = node.get_precision()
-        if prec is None:
-            Log.report(Log.Error, "node with None precision: {}", node)
-        return  prec.get_code_name(language=language)
-    def get_out_prec_code_name(node, language=None):
-        prec = self.get_output_precision(node)
-        if prec is None:
-            Log.report(Log.Error, "node with None precision: {}", node)
-        return  prec.get_code_name(language=language)
-    # input signal declaration
-    input_port_list = ["%s : in %s" % (inp.get_tag(), get_in_prec_code_name(inp, language=language)) for inp in self.arg_list]
-    # output signal declaration
-    output_port_list = ["%s : out %s" % (self.get_port_from_output(out).get_tag(), get_out_prec_code_name(out, language=language)) for out in self.get_output_assign()]
+    cache_key = ("entity", language)
+    if cache_key in self._decl_cache:
+      return self._decl_cache[cache_key]
+    if language is self.language and not None in self._input_decl_strs and not None in self._output_decl_strs_entity:
+      # fast path: per-port strings were pre-computed at add time
+      input_port_list = self._input_decl_strs
+      output_port_list = self._output_decl_strs_entity
+    else:
+      # memoize get_code_name per distinct precision object: a bus format
+      # shared by many ports is only resolved once
+      code_name_cache = {}
+      def get_prec_code_name(node, prec):
+          if prec is None:
+              Log.report(Log.Error, "node with None precision: {}", node)
+          key = id(prec)
+          code_name = code_name_cache.get(key)
+          if code_name is None:
+              code_name = prec.get_code_name(language=language)
+              code_name_cache[key] = code_name
+          return code_name
+      # input signal declaration
+      input_port_list = [f"{inp.get_tag()} : in {get_prec_code_name(inp, inp.get_precision())}" for inp in self.arg_list]
+      # output signal declaration
+      output_port_list = [f"{out.get_input(0).get_tag()} : out {get_prec_code_name(out.get_input(0), self._resolve_output_precision(out))}" for out in self.output_map.values()]
     port_format_list = ";\n  ".join(input_port_list + output_port_list)
     # FIXME: add suport for inout and generic
-    port_desc = "port (\n  {port_list}\n);".format(port_list = port_format_list)
+    port_desc = f"port (\n  {port_format_list}\n);"
     if len(port_format_list) == 0:
       port_desc = ""
-    return "entity {entity_name} is\n{port_desc}\nend {entity_name};\n\n".format(entity_name = self.name, port_desc = port_desc)
+    result = f"entity {self.name} is\n{port_desc}\nend {self.name};\n\n"
+    self._decl_cache[cache_key] = result
+    return result
 
   def get_component_declaration(self, final = True, language = None):
     language = self.language if language is None else language
-    # input signal declaration
-    input_port_list = ["%s : in %s" % (inp.get_tag(), inp.get_precision().get_code_name(language = language)) for inp in self.arg_list]
-    output_port_list = ["%s : out %s" % (self.get_port_from_output(out).get_tag(), self.get_port_from_output(out).get_precision().get_code_name(language = language)) for out in self.get_output_assign()]
+    cache_key = ("component", language)
+    if cache_key in self._decl_cache:
+      return self._decl_cache[cache_key]
+    if language is self.language and not None in self._input_decl_strs and not None in self._output_decl_strs_component:
+      # fast path: per-port strings were pre-computed at add time
+      input_port_list = self._input_decl_strs
+      output_port_list = self._output_decl_strs_component
+    else:
+      # memoize get_code_name per distinct precision object (see
+      # get_declaration)
+      code_name_cache = {}
+      def get_prec_code_name(prec):
+          key = id(prec)
+          code_name = code_name_cache.get(key)
+          if code_name is None:
+              code_name = prec.get_code_name(language=language)
+              code_name_cache[key] = code_name
+          return code_name
+      # input signal declaration
+      input_port_list = [f"{inp.get_tag()} : in {get_prec_code_name(inp.get_precision())}" for inp in self.arg_list]
+      output_port_list = [f"{port.get_tag()} : out {get_prec_code_name(port.get_precision())}" for port in self._output_ports]
     port_format_list = ";\n  ".join(input_port_list + output_port_list)
-    port_desc = "port (\n  {port_list}\n);".format(port_list = port_format_list)
+    port_desc = f"port (\n  {port_format_list}\n);"
     if len(port_format_list) == 0:
       port_desc = ""
     # FIXME: add suport for inout and generic
-    return "component {entity_name}\n{port_desc}\nend component;\n\n".format(entity_name = self.name, port_desc = port_desc)
+    result = f"component {self.name}\n{port_desc}\nend component;\n\n"
+    self._decl_cache[cache_key] = result
+    return result
 
   ## @return function implementation (ML_Operation DAG)
   def get_scheme(self):
-    return Statement(*tuple(self.process_list + list(self.get_output_assign())))
+    if self._scheme_cache is None or self._scheme_version != self._decl_version:
+      self._scheme_cache = Statement(*self.process_list, *self.output_map.values())
+      self._scheme_version = self._decl_version
+    return self._scheme_cache
 
   def declare_inputs(self, code_object):
     for arg_name in self.arg_map:
@@ -230,17 +379,9 @@ class CodeEntity(object):
 
   def get_definition(self, code_generator, language, folded = True, static_cst = False):
     code_object = NestedCode(code_generator, static_cst = static_cst, code_ctor = VHDLCodeObject)
-    code_object.add_local_header("ieee.std_logic_1164.all")
-    code_object.add_local_header("ieee.std_logic_unsigned.all")
-    code_object.add_local_header("ieee.numeric_std.all")
-    code_object << self.get_declaration(final = False, language = language)
-
-    # reserving I/O names
-    self.reserve_io_names(code_object)
-
-    code_object.open_level(inc = False)
-    code_generator.generate_expr(code_object, self.get_scheme(), inlined = folded, initial = False, language = language)
-    code_object.close_level(inc = False)
+    for header in _VHDL_STD_HEADERS:
+      code_object.add_local_header(header)
+    self.add_definition(code_generator, language, code_object, folded = folded, static_cst = static_cst)
     return code_object
 
   def add_definition(self, code_generator, language, code_object, folded = True, static_cst = False):
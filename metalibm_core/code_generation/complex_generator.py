@@ -31,6 +31,8 @@
 # author(s): Nicolas Brunie (nicolas.brunie@kalray.eu)
 ###############################################################################
 
+import weakref
+
 from ..utility.log_report import Log
 from ..utility.source_info import SourceInfo
 
@@ -43,6 +45,9 @@ LOG_LEVEL_COMPLEX_OPERATOR = Log.LogLevel("ComplexOperatorVerbose")
 #  code_generator.generate_expr
 #
 class ComplexOperator(ML_CG_Operator):
+  # slot descriptors for the attributes declared at this level (the
+  # parent class still provides a __dict__ for its own attributes)
+  __slots__ = ("optree_modifier", "backup_operator", "_modifier_cache", "sourceinfo")
 
   ## constructor
   def __init__(self, optree_modifier, backup_operator = None, **kwords):
@@ -51,6 +56,11 @@ class ComplexOperator(ML_CG_Operator):
     self.optree_modifier = optree_modifier
     ## generator used when optree returned by modifier is None
     self.backup_operator = backup_operator
+    ## memoization of optree_modifier results indexed by optree identity
+    #  (weakref-guarded against id re-use, entries evicted when the node
+    #  dies); code generation itself is never cached here as result
+    #  scoping is owned by the code generator's memoization levels
+    self._modifier_cache = {}
 
     self.sourceinfo = SourceInfo.retrieve_source_info(0)
 
@@ -64,12 +74,32 @@ class ComplexOperator(ML_CG_Operator):
   # @param generate_pre_process  lambda function (None by default) used in preprocessing
   # @param kwords         generic keywords dictionnary (see ML_CG_Operator() class for list of supported arguments)
   def generate_expr(self, code_generator, code_object, optree, arg_tuple, generate_pre_process = None, **kwords):
-    new_optree = self.optree_modifier(optree)
-    Log.report(LOG_LEVEL_COMPLEX_OPERATOR, "modified {} to {} ", optree, new_optree)
-    if new_optree is None and self.backup_operator != None:
-      return self.backup_operator.generate_expr(code_generator, code_object, optree, arg_tuple, generate_pre_process = generate_pre_process, **kwords)
+    key = id(optree)
+    cache = self._modifier_cache
+    hit = cache.get(key)
+    if hit is not None and hit[0]() is optree:
+      new_optree = hit[1]
+    else:
+      new_optree = self.optree_modifier(optree)
+      Log.report(LOG_LEVEL_COMPLEX_OPERATOR, "modified {} to {} ", optree, new_optree)
+      def evict(ref, key=key, cache=cache):
+        # drop the entry on node death, unless id re-use already
+        # installed a fresh one
+        if cache.get(key, (None, None))[0] is ref:
+          del cache[key]
+      cache[key] = (weakref.ref(optree, evict), new_optree)
+    if new_optree is None and self.backup_operator is not None:
+      backup_generate_expr = self.backup_operator.generate_expr
+      if not kwords and generate_pre_process is None:
+        # fast path: skip keyword dict re-packaging (the common case)
+        result = backup_generate_expr(code_generator, code_object, optree, arg_tuple)
+      else:
+        result = backup_generate_expr(code_generator, code_object, optree, arg_tuple, generate_pre_process = generate_pre_process, **kwords)
+    elif not kwords:
+      result = code_generator.generate_expr(code_object, new_optree)
     else:
-      return code_generator.generate_expr(code_object, new_optree, **kwords)
+      result = code_generator.generate_expr(code_object, new_optree, **kwords)
+    return result
 
 
 
@@ -31,6 +31,7 @@
 # Author(s):        Nicolas Brunie <metalibmdev@gmail.com>
 ###############################################################################
 
+import functools
 import os
 
 from metalibm_core.core.target import UniqueTargetDecorator
@@ -61,6 +62,7 @@ rdcycleOperator = AsmInlineOperator(
     arity = 0
 )
 
+@functools.lru_cache(maxsize=None)
 def RV_singleOpAsmTemplate(insn, regDst="r", regSrc="f"):
     singleOpOperator = AsmInlineOperator(
    """asm volatile ("{insn}" : "={regDst}" (%s) : "{regSrc}"(%s));\n""".format(insn=insn, regDst=regDst, regSrc=regSrc),
@@ -69,20 +71,41 @@ def RV_singleOpAsmTemplate(insn, regDst="r", regSrc="f"):
     )
     return singleOpOperator
 
+@functools.lru_cache(maxsize=None)
 def lowerNearestInteger(intFormat, targetFormat):
     """ expand conversion into a conversion from
-        conv's input to <intFormat> and then to <targetFormat> """
+        conv's input to <intFormat> and then to <targetFormat>
+
+        The factory is memoized so a given (intFormat, targetFormat)
+        pair shares a single modifier; per-node memoization of the
+        lowered tree is left to the enclosing ComplexOperator """
     def modifier(conv):
         op = conv.get_input(0)
         return Conversion(NearestInteger(op, precision=intFormat), precision=targetFormat)
     return modifier
 
+def _lazy(builder):
+    """ tag a zero-argument operator builder for deferred construction
+        in a _LazyDict """
+    builder._lazy = True
+    return builder
+
+class _LazyDict(dict):
+    """ dict whose values may be deferred operator builders (see _lazy),
+        resolved and cached back on first access """
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if getattr(value, "_lazy", False):
+            value = value()
+            super().__setitem__(key, value)
+        return value
+
 rv64CCodeGenTable = {
     ReadTimeStamp: {
         None: {
-            lambda _: True: {
+            lambda _: True: _LazyDict({
                 type_strict_match(ML_Int64): rdcycleOperator
-            }
+            })
         }
     },
     # Conversion are mapped to function by default
@@ -90,22 +113,40 @@ rv64CCodeGenTable = {
     # implementation
     NearestInteger: {
         None: {
-            lambda optree: True: {
+            lambda optree: True: _LazyDict({
                 type_strict_match(ML_Int32, ML_Binary32):
-                    RV_singleOpAsmTemplate("fcvt.w.s %%0, %%1, rne"),
+                    _lazy(lambda: RV_singleOpAsmTemplate("fcvt.w.s %%0, %%1, rne")),
                 type_strict_match(ML_Binary32, ML_Binary32):
-                    ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int32, ML_Binary32)),
+                    _lazy(lambda: ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int32, ML_Binary32))),
                 type_strict_match(ML_Int64, ML_Binary64):
-                    RV_singleOpAsmTemplate("fcvt.l.d %%0, %%1, rne"),
+                    _lazy(lambda: RV_singleOpAsmTemplate("fcvt.l.d %%0, %%1, rne")),
                 type_strict_match(ML_Int32, ML_Binary64):
-                    ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int64, ML_Int32)),
+                    _lazy(lambda: ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int64, ML_Int32))),
                 type_strict_match(ML_Binary64, ML_Binary64):
-                    ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int64, ML_Binary64)),
-            },
+                    _lazy(lambda: ComplexOperator(optree_modifier=lowerNearestInteger(ML_Int64, ML_Binary64))),
+            }),
         },
     },
 }
 
+@functools.lru_cache(maxsize=1)
+def getSpikePaths():
+    """ resolve (once per process) the proxy-kernel and spike simulator
+        binary paths from the environment """
+    try:
+        pk_bin = os.environ["PK_BIN"]
+    except KeyError:
+        Log.report(Log.Warning, "PK_BIN env var must point to proxy-kernel image")
+        pk_bin = "<PK_BIN undef>"
+
+    try:
+        spike_bin = os.environ["SPIKE_BIN"]
+    except KeyError:
+        Log.report(Log.Warning, "SPIKE_BIN env var must point to spike simulator binary")
+        spike_bin = "<SPIKE_BIN undef>"
+    return pk_bin, spike_bin
+
+
 def buildRVCompilerPath():
     try:
         RISCV_CC = os.environ["RISCV_CC"]
@@ -136,19 +177,8 @@ class RISCV_RV64_Common(VectorBackend):
         return self.getSpikeExecCmd(test_file, "RV64gc")
 
     def getSpikeExecCmd(self, test_file, isa="RV64gc"):
-        try:
-            pk_bin = os.environ["PK_BIN"]
-        except KeyError:
-            Log.report(Log.Warning, "PK_BIN env var must point to proxy-kernel image")
-            pk_bin = "<PK_BIN undef>"
-
-        try:
-            spike_bin = os.environ["SPIKE_BIN"]
-        except KeyError:
-            Log.report(Log.Warning, "SPIKE_BIN env var must point to spike simulator binary")
-            spike = "<SPIKE_BIN undef>"
-        cmd = f"{spike_bin} --isa={isa} {pk_bin} {test_file}"
-        return cmd
+        pk_bin, spike_bin = getSpikePaths()
+        return f"{spike_bin} --isa={isa} {pk_bin} {test_file}"
 
 
 @UniqueTargetDecorator